@@ -10,15 +10,19 @@ Calculates:
 
 from __future__ import annotations
 
+import multiprocessing
 import os
-import statistics
+import re
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
 from radon.complexity import cc_visit
 from radon.metrics import mi_visit
 
+from app.analyzer_cache import cache_key, lookup, store
+
 
 ANALYZABLE_EXTENSIONS = {
     ".py", ".js", ".ts", ".jsx", ".tsx",
@@ -26,8 +30,32 @@ ANALYZABLE_EXTENSIONS = {
     ".c", ".cpp", ".h", ".cs",
 }
 
+# Per-file work is spread over worker processes; small trees stay in-process
+# because pool start-up would cost more than the analysis itself.
+MAX_WORKERS = int(os.getenv("ANALYZER_WORKERS", "0")) or os.cpu_count() or 1
+PARALLEL_MIN_FILES = 32
+
+# Directories never descended into (hidden directories are skipped as well)
+EXCLUDED_DIRS = frozenset({"node_modules", "__pycache__", "venv", ".git"})
+
+# Larger files are almost always generated/minified; radon gains nothing on them
+MAX_FILE_BYTES = 2 * 1024 * 1024
+
+# Everything except braces; stripped before the nesting-depth scan.
+_NON_BRACE = re.compile(r"[^{}]+")
+
+# forkserver avoids forking the (multi-threaded) uvicorn worker directly.
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# The fork server imports the scan modules (radon, every compiled pattern) once;
+# workers are forked from it with all of that already in memory instead of
+# each re-importing and re-compiling on start-up.
+if _MP_CONTEXT.get_start_method() == "forkserver":
+    _MP_CONTEXT.set_forkserver_preload(["app.scanner"])
+
 
-@dataclass
+@dataclass(slots=True)
 class FileMetrics:
     path: str
     lines: int = 0
@@ -35,7 +63,7 @@ class FileMetrics:
     maintainability: float = 100.0
 
 
-@dataclass
+@dataclass(slots=True)
 class CommitMetrics:
     total_lines: int = 0
     lines_added: int = 0
@@ -47,17 +75,46 @@ class CommitMetrics:
     file_details: list[FileMetrics] = field(default_factory=list)
 
 
-def analyze_file(filepath: str) -> FileMetrics | None:
-    """Analyze a single file for complexity and maintainability."""
-    ext = Path(filepath).suffix.lower()
+def file_extension(name: str) -> str:
+    """Lower-cased extension of a file name (``""`` for none or dotfiles).
+
+    Same result as ``Path(name).suffix.lower()`` for a bare name, without
+    building a path object per file.
+    """
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot > 0 else ""
+
+
+def analyze_file(filepath: str, ext: str | None = None) -> FileMetrics | None:
+    """Analyze a single file for complexity and maintainability.
+
+    Walkers that already know the extension pass it as ``ext``.
+    """
+    if ext is None:
+        ext = file_extension(os.path.basename(filepath))
     if ext not in ANALYZABLE_EXTENSIONS:
         return None
 
     try:
-        with open(filepath, "r", errors="ignore") as f:
-            content = f.read()
-    except (OSError, UnicodeDecodeError):
+        with open(filepath, "rb") as f:
+            raw = f.read()
+    except OSError:
         return None
+    return analyze_content(filepath, ext, raw)
+
+
+def analyze_content(filepath: str, ext: str, raw: bytes) -> FileMetrics:
+    """Compute metrics for file contents already read by the caller."""
+    key = cache_key(raw, ext)
+    cached = lookup(key)
+    if cached is not None:
+        lines, complexity, maintainability = cached
+        return FileMetrics(path=filepath, lines=lines, complexity=complexity, maintainability=maintainability)
+
+    # Same result as text-mode reading: lenient decode + universal newlines
+    content = raw.decode("utf-8", errors="ignore")
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
 
     lines = content.count("\n") + (1 if content and not content.endswith("\n") else 0)
 
@@ -68,7 +125,7 @@ def analyze_file(filepath: str) -> FileMetrics | None:
         try:
             blocks = cc_visit(content)
             if blocks:
-                complexity = statistics.mean(b.complexity for b in blocks)
+                complexity = sum(b.complexity for b in blocks) / len(blocks)
         except Exception:
             pass
         try:
@@ -76,10 +133,11 @@ def analyze_file(filepath: str) -> FileMetrics | None:
         except Exception:
             maintainability = 50.0
     else:
-        # Heuristic for non-Python: estimate complexity from nesting depth
+        # Heuristic for non-Python: estimate complexity from nesting depth.
+        # Only the braces matter, so drop everything else in C first.
         nesting = 0
         max_nesting = 0
-        for char in content:
+        for char in _NON_BRACE.sub("", content):
             if char == "{":
                 nesting += 1
                 max_nesting = max(max_nesting, nesting)
@@ -88,12 +146,25 @@ def analyze_file(filepath: str) -> FileMetrics | None:
         complexity = min(max_nesting, 20)
         maintainability = max(0, 100 - (complexity * 4) - (lines / 50))
 
-    return FileMetrics(
+    fm = FileMetrics(
         path=filepath,
         lines=lines,
         complexity=round(complexity, 2),
         maintainability=round(max(0, min(100, maintainability)), 2),
     )
+    store(key, fm.lines, fm.complexity, fm.maintainability)
+    return fm
+
+
+def map_files(func: Callable, items: list, chunksize: int = 32) -> list:
+    """Apply ``func`` to every item, in worker processes when the batch is large.
+
+    ``func`` must be a module-level function (picklable). Results keep input order.
+    """
+    if MAX_WORKERS <= 1 or len(items) < PARALLEL_MIN_FILES:
+        return [func(item) for item in items]
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_MP_CONTEXT) as ex:
+        return list(ex.map(func, items, chunksize=chunksize))
 
 
 def compute_quality_score(metrics: CommitMetrics) -> float:
@@ -135,45 +206,126 @@ def compute_quality_score(metrics: CommitMetrics) -> float:
 
 
 def analyze_diff(diff_text: str) -> tuple[int, int]:
-    """Count lines added and deleted from a unified diff."""
-    added = 0
-    deleted = 0
-    for line in diff_text.splitlines():
-        if line.startswith("+") and not line.startswith("+++"):
-            added += 1
-        elif line.startswith("-") and not line.startswith("---"):
-            deleted += 1
+    """Count lines added and deleted from a unified diff.
+
+    Counts line-start markers with ``str.count`` instead of splitting the diff
+    into lines; ``+++``/``---`` file headers are subtracted back out.
+    """
+    added = diff_text.count("\n+") - diff_text.count("\n+++")
+    deleted = diff_text.count("\n-") - diff_text.count("\n---")
+
+    # The first line has no preceding newline
+    if diff_text.startswith("+") and not diff_text.startswith("+++"):
+        added += 1
+    elif diff_text.startswith("-") and not diff_text.startswith("---"):
+        deleted += 1
     return added, deleted
 
 
-def analyze_directory(directory: str) -> CommitMetrics:
-    """Walk a directory tree and produce aggregate metrics."""
-    metrics = CommitMetrics()
-    complexities = []
-    maintainabilities = []
+def read_diff(lines: Iterable[bytes], keep_bytes: int) -> tuple[int, int, str]:
+    """Count lines added and deleted while a unified diff is read line by line.
 
-    for root, _, files in os.walk(directory):
-        # Skip hidden dirs and common non-source dirs
-        if any(part.startswith(".") or part in ("node_modules", "__pycache__", "venv", ".git")
-               for part in Path(root).parts):
+    Only the first ``keep_bytes`` of the diff (whole lines) are kept and
+    returned as text; past that, lines are counted and dropped, so a huge
+    push never sits in memory as one string.
+    """
+    added = deleted = 0
+    kept: list[bytes] = []
+    room = keep_bytes
+    for line in lines:
+        if line.startswith(b"+"):
+            if not line.startswith(b"+++"):
+                added += 1
+        elif line.startswith(b"-"):
+            if not line.startswith(b"---"):
+                deleted += 1
+        if room:
+            if len(line) <= room:
+                kept.append(line)
+                room -= len(line)
+            else:
+                room = 0
+    return added, deleted, b"".join(kept).decode("utf-8", errors="replace")
+
+
+def iter_files(directory: str, excluded_dirs: frozenset[str] = EXCLUDED_DIRS) -> Iterator[os.DirEntry]:
+    """Yield every file under ``directory``, skipping hidden and excluded dirs.
+
+    Uses ``os.scandir`` directly so entry type comes from the directory listing
+    and callers get ``DirEntry.name`` / ``DirEntry.stat()`` without extra joins.
+    """
+    stack = [directory]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
             continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith(".") and entry.name not in excluded_dirs:
+                        stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry
 
-        for fname in files:
-            fpath = os.path.join(root, fname)
-            fm = analyze_file(fpath)
-            if fm is None:
+
+def _collect_source_files(directory: str) -> list[tuple[str, str]]:
+    """List analyzable files under ``directory``, skipping hidden and vendored dirs.
+
+    Filters on extension and size up front so non-source files never reach
+    ``analyze_file`` (or a worker process).
+    """
+    files = []
+    for entry in iter_files(directory):
+        ext = file_extension(entry.name)
+        if ext not in ANALYZABLE_EXTENSIONS:
+            continue
+        try:
+            if entry.stat().st_size > MAX_FILE_BYTES:
                 continue
+        except OSError:
+            continue
+        files.append((entry.path, ext))
+    return files
+
+
+def _analyze_source(item: tuple[str, str]) -> FileMetrics | None:
+    return analyze_file(*item)
 
-            metrics.total_lines += fm.lines
-            metrics.files_changed += 1
+
+def summarize_files(file_metrics: Iterable[FileMetrics | None], collect_details: bool = False) -> CommitMetrics:
+    """Aggregate per-file results (``None`` entries are skipped) into commit metrics.
+
+    Only running sums are kept unless ``collect_details`` is set, in which case
+    every ``FileMetrics`` is also retained in ``file_details``.
+    """
+    metrics = CommitMetrics()
+    complexity_sum = 0.0
+    maintainability_sum = 0.0
+
+    for fm in file_metrics:
+        if fm is None:
+            continue
+
+        metrics.total_lines += fm.lines
+        metrics.files_changed += 1
+        if collect_details:
             metrics.file_details.append(fm)
-            complexities.append(fm.complexity)
-            maintainabilities.append(fm.maintainability)
+        complexity_sum += fm.complexity
+        maintainability_sum += fm.maintainability
 
-    if complexities:
-        metrics.complexity_avg = round(statistics.mean(complexities), 2)
-    if maintainabilities:
-        metrics.maintainability_index = round(statistics.mean(maintainabilities), 2)
+    if metrics.files_changed:
+        metrics.complexity_avg = round(complexity_sum / metrics.files_changed, 2)
+        metrics.maintainability_index = round(maintainability_sum / metrics.files_changed, 2)
 
     metrics.quality_score = compute_quality_score(metrics)
     return metrics
+
+
+def analyze_directory(directory: str, collect_details: bool = False) -> CommitMetrics:
+    """Walk a directory tree and produce aggregate metrics.
+
+    The push pipeline uses ``app.scanner.scan_directory`` instead, which also
+    collects deprecation hits from the same read.
+    """
+    return summarize_files(map_files(_analyze_source, _collect_source_files(directory)), collect_details)
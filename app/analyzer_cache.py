@@ -0,0 +1,97 @@
+"""
+Persistent cache for per-file analysis results.
+
+Every push is cloned into a fresh temp directory, so paths and mtimes never
+repeat between runs. Entries are keyed by a digest of the file contents (plus
+extension) instead, letting unchanged files skip radon entirely.
+
+Backed by a standalone SQLite file so it works regardless of DATABASE_URL and
+can be shared by the analyzer worker processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+CACHE_PATH = os.getenv("ANALYZER_CACHE_PATH", "/data/analyzer-cache.db")
+CACHE_TTL_DAYS = int(os.getenv("ANALYZER_CACHE_TTL_DAYS", "30"))
+
+_conn: sqlite3.Connection | None = None
+_disabled = not CACHE_PATH
+# Analyses run on several threads of a process (request executor, job pool);
+# they share the one connection, one statement at a time.
+_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection | None:
+    """Open (once per process) the cache DB; disable caching if unavailable.
+
+    Call with ``_lock`` held.
+    """
+    global _conn, _disabled
+    if _conn is not None or _disabled:
+        return _conn
+
+    try:
+        conn = sqlite3.connect(CACHE_PATH, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_metrics ("
+            " key TEXT PRIMARY KEY,"
+            " lines INTEGER NOT NULL,"
+            " complexity REAL NOT NULL,"
+            " maintainability REAL NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_file_metrics_created ON file_metrics (created_at)")
+        # Evict stale entries so the cache doesn't grow without bound
+        conn.execute(
+            "DELETE FROM file_metrics WHERE created_at < ?",
+            (time.time() - CACHE_TTL_DAYS * 86400,),
+        )
+    except sqlite3.Error:
+        _disabled = True
+        return None
+
+    _conn = conn
+    return _conn
+
+
+def cache_key(content: bytes, ext: str) -> str:
+    """Key a file by extension (it selects the analysis path) and content digest."""
+    return f"{ext}:{hashlib.sha1(content).hexdigest()}"
+
+
+def lookup(key: str) -> tuple[int, float, float] | None:
+    """Return cached (lines, complexity, maintainability) or None on miss."""
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT lines, complexity, maintainability FROM file_metrics WHERE key = ?", (key,),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+    return tuple(row) if row else None
+
+
+def store(key: str, lines: int, complexity: float, maintainability: float) -> None:
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_metrics VALUES (?, ?, ?, ?, ?)",
+                (key, lines, complexity, maintainability, time.time()),
+            )
+        except sqlite3.Error:
+            pass
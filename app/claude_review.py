@@ -11,6 +11,7 @@ Uses Claude API to:
 from __future__ import annotations
 
 import os
+import re
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
@@ -26,8 +27,18 @@ if TYPE_CHECKING:
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929")
 
+# Max characters of diff sent to Claude
+DIFF_BUDGET = 15000
 
-@dataclass
+# Opinions of the reviews returned when Claude couldn't be asked
+_KEY_MISSING = "Claude API key not configured. Set ANTHROPIC_API_KEY environment variable."
+_API_ERROR = "Claude API error: "
+
+_FILE_SPLIT = re.compile(r"^(?=diff --git )", re.MULTILINE)
+_HUNK_SPLIT = re.compile(r"^(?=@@ )", re.MULTILINE)
+
+
+@dataclass(slots=True)
 class ClaudeReview:
     opinion: str = ""
     code_smells: list[str] | None = None
@@ -37,6 +48,36 @@ class ClaudeReview:
     raw_response: str = ""
 
 
+def _sample_diff(diff_text: str, budget: int = DIFF_BUDGET) -> str:
+    """Fit a diff into ``budget`` characters, spreading it across files.
+
+    Takes every file's header first, then the first hunk of each file, then the
+    second, and so on. A plain head cut would only show the first few files of
+    a large push.
+    """
+    if len(diff_text) <= budget:
+        return diff_text
+
+    # files[i] = [header, hunk1, hunk2, ...]
+    files = [_HUNK_SPLIT.split(f) for f in _FILE_SPLIT.split(diff_text) if f]
+    selected: list[list[str]] = [[] for _ in files]
+    remaining = budget
+
+    for depth in range(max(len(parts) for parts in files)):
+        for parts, chosen in zip(files, selected):
+            # A file whose header didn't fit is dropped entirely
+            if depth >= len(parts) or (depth > 0 and not chosen):
+                continue
+            if len(parts[depth]) <= remaining:
+                chosen.append(parts[depth])
+                remaining -= len(parts[depth])
+
+    sampled = "".join("".join(chosen) for chosen in selected)
+    if not sampled.strip():
+        sampled = diff_text[:budget]
+    return sampled + "\n... (diff truncated)\n"
+
+
 def _build_review_prompt(
     diff_text: str,
     metrics: CommitMetrics,
@@ -90,7 +131,7 @@ def _build_review_prompt(
 {trend_section}
 ## Diff del Push (ultimas modificaciones)
 ```
-{diff_text[:15000]}
+{_sample_diff(diff_text)}
 ```
 
 ---
@@ -124,7 +165,7 @@ def review_with_claude(
     """Send code diff and metrics to Claude for AI-powered review."""
     if not ANTHROPIC_API_KEY:
         return ClaudeReview(
-            opinion="Claude API key not configured. Set ANTHROPIC_API_KEY environment variable.",
+            opinion=_KEY_MISSING,
             overall_summary="No AI review available - API key missing",
         )
 
@@ -148,17 +189,27 @@ def review_with_claude(
         )
         response_text = message.content[0].text
 
-        review = ClaudeReview(raw_response=response_text)
-        _parse_review(review, response_text)
-        return review
+        return parse_review(response_text)
 
     except anthropic.APIError as e:
         return ClaudeReview(
-            opinion=f"Claude API error: {e}",
+            opinion=f"{_API_ERROR}{e}",
             overall_summary="AI review failed",
         )
 
 
+def review_failed(text: str) -> bool:
+    """True when a stored review is the placeholder for a review that never ran."""
+    return text.startswith((_KEY_MISSING, _API_ERROR))
+
+
+def parse_review(text: str) -> ClaudeReview:
+    """Rebuild a review from Claude's raw (or stored) markdown response."""
+    review = ClaudeReview(raw_response=text)
+    _parse_review(review, text)
+    return review
+
+
 def _parse_review(review: ClaudeReview, text: str) -> None:
     """Best-effort parse of Claude's markdown response into structured fields."""
     sections = text.split("##")
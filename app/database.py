@@ -1,21 +1,37 @@
+from __future__ import annotations
+
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import (
-    Column, DateTime, Float, Integer, String, Text, UniqueConstraint,
-    create_engine,
+    Column, DateTime, Float, Index, Integer, String, Text, UniqueConstraint,
+    create_engine, event, func, inspect, select,
 )
-from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.orm import DeclarativeBase, Session, deferred, sessionmaker
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////data/metrics.db")
+# Rebuild the rollup tables from their source tables on start (maintenance)
+REBUILD_ROLLUPS = os.getenv("REBUILD_ROLLUPS", "") == "1"
 
 if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _):
+        # WAL + NORMAL sync: one fsync per checkpoint instead of per commit
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.close()
 else:
     engine = create_engine(DATABASE_URL)
 
-SessionLocal = sessionmaker(bind=engine)
+# Rows stay usable after commit without a re-SELECT (e.g. analysis.id in responses)
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -35,10 +51,10 @@ class CommitAnalysis(Base):
     __tablename__ = "commit_analyses"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    repo_name = Column(String(255), nullable=False, index=True)
-    commit_sha = Column(String(40), nullable=False, index=True)
+    repo_name = Column(String(255), nullable=False)
+    commit_sha = Column(String(40), nullable=False)
     branch = Column(String(255), default="main")
-    author = Column(String(255), index=True)
+    author = Column(String(255))
     message = Column(Text)
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
@@ -56,14 +72,26 @@ class CommitAnalysis(Base):
     integrity_status = Column(String(20), default="pending")  # pending | pass | fail
 
     # --- claude review ---
-    claude_review = Column(Text, default="")
-    md_report = Column(Text, default="")
-    deprecation_warnings = Column(Text, default="")
+    # Large text blobs, only needed by the detail/report endpoints: deferred so
+    # listings and aggregates don't fetch them (load with undefer()).
+    claude_review = deferred(Column(Text, default=""))
+    md_report = deferred(Column(Text, default=""))
+    deprecation_warnings = deferred(Column(Text, default=""))
 
     # --- trend ---
     quality_delta = Column(Float, default=0.0)
     trend_direction = Column(String(20), default="stable")  # improving | stable | declining
 
+    # Composites follow the hot filters (repo, then branch/author) + time ordering;
+    # (author, timestamp) also serves plain author lookups
+    __table_args__ = (
+        Index("ix_ca_repo_ts", "repo_name", "timestamp"),
+        Index("ix_ca_repo_branch_ts", "repo_name", "branch", "timestamp"),
+        Index("ix_ca_repo_author_ts", "repo_name", "author", "timestamp"),
+        Index("ix_ca_author_ts", "author", "timestamp"),
+        Index("ix_ca_repo_sha", "repo_name", "commit_sha"),
+    )
+
 
 class PushEvent(Base):
     __tablename__ = "push_events"
@@ -74,7 +102,7 @@ class PushEvent(Base):
     pusher = Column(String(255))
     commit_count = Column(Integer, default=0)
     head_sha = Column(String(40))
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     overall_score = Column(Float, default=0.0)
 
 
@@ -82,7 +110,7 @@ class CodebaseSnapshot(Base):
     __tablename__ = "codebase_snapshots"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    repo_name = Column(String(255), nullable=False, index=True)
+    repo_name = Column(String(255), nullable=False)
     branch = Column(String(255), default="main")
     commit_sha = Column(String(40), nullable=False)
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
@@ -98,12 +126,16 @@ class CodebaseSnapshot(Base):
     deprecation_count = Column(Integer, default=0)
     content_hash = Column(String(64), index=True)
 
+    __table_args__ = (
+        Index("ix_snap_repo_branch_ts", "repo_name", "branch", "timestamp"),
+    )
+
 
 class DeveloperStats(Base):
     __tablename__ = "developer_stats"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    repo_name = Column(String(255), nullable=False, index=True)
+    repo_name = Column(String(255), nullable=False)
     developer = Column(String(255), nullable=False, index=True)
 
     total_pushes = Column(Integer, default=0)
@@ -120,6 +152,7 @@ class DeveloperStats(Base):
     last_push = Column(DateTime)
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # The unique constraint doubles as the (repo_name, developer) lookup index
     __table_args__ = (
         UniqueConstraint("repo_name", "developer", name="uq_repo_developer"),
     )
@@ -129,7 +162,7 @@ class WeeklyDigest(Base):
     __tablename__ = "weekly_digests"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    repo_name = Column(String(255), nullable=False, index=True)
+    repo_name = Column(String(255), nullable=False)
     week_start = Column(DateTime, nullable=False)
     week_end = Column(DateTime, nullable=False)
 
@@ -146,9 +179,143 @@ class WeeklyDigest(Base):
 
     generated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        Index("ix_digest_repo_week", "repo_name", "week_start"),
+    )
+
+
+class AnalysisJob(Base):
+    """A push queued with ``POST /api/analyze?background=1``."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    repo_name = Column(String(255), nullable=False)
+    head_sha = Column(String(40))
+    status = Column(String(20), default="queued")  # queued | running | done | failed
+    analysis_id = Column(Integer)  # set when done
+    error = Column(Text)
+    # Refreshed by the process holding the job (queued in its pool or running)
+    heartbeat_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime)
+
+
+# An open job whose heartbeat is older than this lost its process (crash,
+# restart, redeploy): whoever looks at it next marks it failed.
+JOB_LEASE_SECONDS = 120
+
+
+def fail_orphaned_jobs(db: Session, job_id: str | None = None) -> int:
+    """Mark open jobs (or just ``job_id``) whose lease ran out as failed; returns how many."""
+    now = datetime.now(timezone.utc)
+    query = db.query(AnalysisJob).filter(
+        AnalysisJob.status.in_(("queued", "running")),
+        AnalysisJob.heartbeat_at < now - timedelta(seconds=JOB_LEASE_SECONDS),
+    )
+    if job_id is not None:
+        query = query.filter(AnalysisJob.id == job_id)
+    return query.update(
+        {"status": "failed", "error": "Interrupted: the service stopped before the job finished", "finished_at": now},
+        synchronize_session=False,
+    )
+
+
+class AnalysisTotals(Base):
+    """Running totals over commit_analyses, kept in a single row (id=1).
+
+    Updated in the same transaction as each new analysis, so the dashboard
+    reads one row instead of aggregating the whole table; rebuilt from the
+    table by ``init_db`` when missing, or with REBUILD_ROLLUPS=1 to correct drift.
+    """
+    __tablename__ = "analysis_totals"
+
+    id = Column(Integer, primary_key=True)
+    total_analyses = Column(Integer, nullable=False, default=0)
+    quality_score_sum = Column(Float, nullable=False, default=0.0)
+    quality_score_count = Column(Integer, nullable=False, default=0)
+
+
+class LatestSnapshot(Base):
+    """The newest codebase snapshot of each repo/branch: the trend baseline.
+
+    Upserted alongside every new snapshot, so ``compute_trend`` does a
+    primary-key lookup instead of searching the history; rebuilt from
+    codebase_snapshots by ``init_db`` when empty, or with REBUILD_ROLLUPS=1.
+    """
+    __tablename__ = "latest_snapshots"
+
+    repo_name = Column(String(255), primary_key=True)
+    branch = Column(String(255), primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    total_lines = Column(Integer, default=0)
+    complexity_avg = Column(Float, default=0.0)
+    quality_score = Column(Float, default=0.0)
+
+
+def rebuild_latest_snapshots(db: Session) -> None:
+    ranked = select(
+        CodebaseSnapshot.repo_name, CodebaseSnapshot.branch, CodebaseSnapshot.timestamp,
+        CodebaseSnapshot.total_lines, CodebaseSnapshot.complexity_avg, CodebaseSnapshot.quality_score,
+        func.row_number().over(
+            partition_by=(CodebaseSnapshot.repo_name, CodebaseSnapshot.branch),
+            order_by=(CodebaseSnapshot.timestamp.desc(), CodebaseSnapshot.id.desc()),
+        ).label("rn"),
+    ).subquery()
+    columns = ("repo_name", "branch", "timestamp", "total_lines", "complexity_avg", "quality_score")
+    rows = db.execute(select(*(ranked.c[name] for name in columns)).where(ranked.c.rn == 1)).mappings().all()
+    db.query(LatestSnapshot).delete()
+    if rows:
+        db.execute(LatestSnapshot.__table__.insert(), [dict(row) for row in rows])
+
+
+def rebuild_analysis_totals(db: Session) -> None:
+    total, score_sum, score_count = db.query(
+        func.count(CommitAnalysis.id),
+        func.coalesce(func.sum(CommitAnalysis.quality_score), 0.0),
+        func.count(CommitAnalysis.quality_score),
+    ).one()
+    db.merge(AnalysisTotals(
+        id=1, total_analyses=total, quality_score_sum=score_sum, quality_score_count=score_count,
+    ))
+
+
+def _create_missing_indexes() -> bool:
+    """Add declared indexes that an existing table lacks; True if any were created.
+
+    ``create_all`` only creates indexes together with their table, so indexes
+    declared after a table was first created would otherwise never exist.
+    """
+    inspector = inspect(engine)
+    created = False
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn)
+                    created = True
+    return created
+
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    indexes_created = _create_missing_indexes()
+    with SessionLocal() as db:
+        # Rollups are kept in step with every analysis; only fill them when new
+        rebuilt = False
+        if REBUILD_ROLLUPS or db.get(AnalysisTotals, 1) is None:
+            rebuild_analysis_totals(db)
+            rebuilt = True
+        if REBUILD_ROLLUPS or db.query(LatestSnapshot).first() is None:
+            rebuild_latest_snapshots(db)
+            rebuilt = True
+        # Jobs run inside the API process that queued them; fail the ones whose process is gone
+        fail_orphaned_jobs(db)
+        db.commit()
+    if rebuilt or indexes_created:
+        # Refresh planner statistics so the planner sees the new indexes and rollups
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
 
 
 def get_db() -> Session:
@@ -10,10 +10,12 @@ from __future__ import annotations
 import os
 import re
 from dataclasses import dataclass, field
-from pathlib import Path
+from functools import partial
 
+from app.analyzer import file_extension, iter_files, map_files
 
-@dataclass
+
+@dataclass(slots=True)
 class DeprecationWarning:
     file: str
     line: int
@@ -98,53 +100,192 @@ LANG_MAP = {
 }
 
 
-def detect_deprecations(directory: str) -> list[DeprecationWarning]:
-    """Scan all source files for deprecated patterns."""
-    warnings: list[DeprecationWarning] = []
+EXCLUDED_DIRS = frozenset({"node_modules", "__pycache__", "venv", ".git", "dist", "build"})
 
-    for root, _, files in os.walk(directory):
-        if any(part.startswith(".") or part in ("node_modules", "__pycache__", "venv", ".git", "dist", "build")
-               for part in Path(root).parts):
-            continue
+# Rows shown in the Markdown table; the total count is always reported
+MAX_REPORTED = 50
 
-        for fname in files:
-            # Skip self-detection (this file contains patterns as strings, not usage)
-            if fname == "deprecation_detector.py":
-                continue
+LANG_NAMES = {
+    ".py": "Python", ".js": "JavaScript", ".jsx": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".java": "Java", ".go": "Go",
+}
 
-            fpath = os.path.join(root, fname)
-            ext = Path(fname).suffix.lower()
 
-            patterns = LANG_MAP.get(ext, []) + GENERAL_DEPRECATIONS
-            if not patterns:
-                continue
+# Zero-width escapes: they don't consume input, so a literal runs straight through them
+_ZERO_WIDTH_ESCAPES = frozenset("bBAZ")
+_QUANTIFIERS = frozenset("*+?{")
+
+
+def _required_literal(pattern: str) -> str | None:
+    """Longest plain substring every match of ``pattern`` must contain, if any.
 
-            try:
-                with open(fpath, "r", errors="ignore") as f:
-                    lines = f.readlines()
-            except OSError:
+    Only handles the simple shapes used in the pattern lists: escaped
+    punctuation counts as literal, anything inside a group/class or under a
+    quantifier ends the run, and a top-level ``|`` means nothing is required.
+    """
+    runs: list[str] = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            if nxt in _ZERO_WIDTH_ESCAPES:
                 continue
+            if not nxt.isalnum():
+                literal = nxt
+        elif char == "|" and depth == 0:
+            return None
+        elif char in "([":
+            if pattern.startswith("(?", i) and pattern[i + 2:i + 3].isalpha():
+                return None  # inline flags / named groups: not worth handling
+            depth += 1
+            i += 1
+        elif char in ")]":
+            depth -= 1
+            i += 1
+        else:
+            if depth == 0 and char not in ".^$" and char not in _QUANTIFIERS:
+                literal = char
+            i += 1
+
+        if literal is not None and depth == 0:
+            if i < len(pattern) and pattern[i] in _QUANTIFIERS:
+                # x? / x* / x{0,} may drop the char; x+ keeps one but repeats break the run
+                if pattern[i] == "+":
+                    current += literal
+                runs.append(current)
+                current = ""
+            else:
+                current += literal
+        else:
+            runs.append(current)
+            current = ""
+    runs.append(current)
+
+    longest = max(runs, key=len)
+    return longest or None
+
+
+# An unescaped ``\s`` (a preceding even run of backslashes is kept as is)
+_WHITESPACE_ESCAPE = re.compile(r"(?<!\\)((?:\\\\)*)\\s")
+
+
+def _single_line(pattern: str) -> str:
+    r"""Stop ``\s`` from matching a newline.
+
+    The patterns used to be searched one line at a time; with ``\s`` limited
+    to the line (nothing else in the lists can match a newline: no negated
+    classes, ``.`` never does), a match over the whole file never spans lines.
+    """
+    return _WHITESPACE_ESCAPE.sub(r"\1[^\\S\\n]", pattern)
+
+
+# (combined regex, each pattern compiled on its own, (label, message) per
+# pattern, required literals or None)
+Scanner = tuple[re.Pattern, list[re.Pattern], list[tuple[str, str]], tuple[str, ...] | None]
+
+
+def _combine(patterns: list[tuple[str, str]]) -> re.Pattern:
+    """Join patterns into one single-line alternation, to find lines with any hit."""
+    return re.compile("|".join(f"(?:{_single_line(pattern)})" for pattern, _ in patterns))
+
 
-            rel_path = os.path.relpath(fpath, directory)
-
-            for line_num, line_content in enumerate(lines, 1):
-                for pattern, message in patterns:
-                    if re.search(pattern, line_content):
-                        lang = {
-                            ".py": "Python", ".js": "JavaScript", ".jsx": "JavaScript",
-                            ".ts": "TypeScript", ".tsx": "TypeScript",
-                            ".java": "Java", ".go": "Go",
-                        }.get(ext, "General")
-
-                        warnings.append(DeprecationWarning(
-                            file=rel_path,
-                            line=line_num,
-                            pattern=pattern[:50],
-                            message=message,
-                            language=lang,
-                        ))
-                        break  # one warning per line
+def _scanner(patterns: list[tuple[str, str]]) -> Scanner:
+    """Compile a pattern list once: combined regex, individual patterns,
+    (label, message) per pattern and the literal prefilter (``None`` when some
+    pattern has no required literal).
+    """
+    literals = [_required_literal(pattern) for pattern, _ in patterns]
+    prefilter = None if None in literals else tuple(dict.fromkeys(literals))
+    return (
+        _combine(patterns),
+        [re.compile(pattern) for pattern, _ in patterns],
+        [(pattern[:50], message) for pattern, message in patterns],
+        prefilter,
+    )
 
+
+# Every extension scans its language patterns plus the general ones, in one regex.
+# Extensions sharing a list (.js/.jsx/.ts/.tsx) share one compiled scanner.
+_LANG_LISTS = {id(patterns): patterns for patterns in LANG_MAP.values()}
+_LANG_SCANNERS = {key: _scanner(patterns + GENERAL_DEPRECATIONS) for key, patterns in _LANG_LISTS.items()}
+SCANNERS = {ext: _LANG_SCANNERS[id(patterns)] for ext, patterns in LANG_MAP.items()}
+GENERAL_SCANNER = _scanner(GENERAL_DEPRECATIONS)
+
+
+def _scan_one(item: tuple[str, str], directory: str) -> list[DeprecationWarning]:
+    """Scan a single ``(path, extension)`` for deprecated patterns (runs in a worker process)."""
+    fpath, ext = item
+    try:
+        with open(fpath, "rb") as f:
+            content = f.read()
+    except OSError:
+        return []
+    return scan_content(content, ext, os.path.relpath(fpath, directory))
+
+
+def scan_content(content: bytes, ext: str, rel_path: str) -> list[DeprecationWarning]:
+    """Find deprecated patterns in raw file bytes; ``ext`` selects the language set."""
+    combined, patterns, labels, prefilter = SCANNERS.get(ext, GENERAL_SCANNER)
+    # Matched as text, not bytes: \b, \w and \s must see non-ASCII letters and
+    # spaces as such (a bytes pattern would find a word boundary in "éimp.x")
+    text = content.decode("utf-8", errors="ignore")
+    # Most files contain none of the required literals; str.__contains__ is a
+    # C-level substring search, far cheaper than running the regex.
+    if prefilter is not None and not any(literal in text for literal in prefilter):
+        return []
+
+    # Lines as text-mode reading splits them: \r\n and a lone \r end a line too
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    lang = LANG_NAMES.get(ext, "General")
+    warnings: list[DeprecationWarning] = []
+    line_num = 1
+    pos = 0
+
+    match = combined.search(text)
+    while match:
+        # Advance the line counter over the text since the previous hit only
+        start = match.start()
+        line_num += text.count("\n", pos, start)
+        pos = start
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", start) + 1 or len(text)
+
+        # The combined regex finds the leftmost hit; the line is reported under
+        # the first pattern in list order that matches anywhere on it
+        line = text[line_start:line_end]
+        index = next(i for i, pattern in enumerate(patterns) if pattern.search(line))
+        label, message = labels[index]
+        warnings.append(DeprecationWarning(
+            file=rel_path,
+            line=line_num,
+            pattern=label,
+            message=message,
+            language=lang,
+        ))
+        match = combined.search(text, line_end)  # one warning per line
+
+    return warnings
+
+
+def detect_deprecations(directory: str) -> list[DeprecationWarning]:
+    """Scan all source files for deprecated patterns."""
+    # Skip self-detection (this file contains patterns as strings, not usage)
+    files = [
+        (entry.path, file_extension(entry.name)) for entry in iter_files(directory, EXCLUDED_DIRS)
+        if entry.name != "deprecation_detector.py"
+    ]
+
+    warnings: list[DeprecationWarning] = []
+    for file_warnings in map_files(partial(_scan_one, directory=directory), files):
+        warnings.extend(file_warnings)
     return warnings
 
 
@@ -153,14 +294,14 @@ def format_deprecations_md(warnings: list[DeprecationWarning]) -> str:
     if not warnings:
         return "Sin deprecaciones detectadas."
 
-    lines = [f"Se detectaron **{len(warnings)}** uso(s) de funciones/APIs deprecadas:\n"]
-    lines.append("| Archivo | Linea | Lenguaje | Detalle |")
-    lines.append("|---------|-------|----------|---------|")
-
-    for w in warnings[:50]:  # cap at 50 to avoid huge reports
-        lines.append(f"| `{w.file}` | {w.line} | {w.language} | {w.message} |")
-
-    if len(warnings) > 50:
-        lines.append(f"\n... y {len(warnings) - 50} mas.")
+    shown = warnings[:MAX_REPORTED]  # cap to avoid huge reports
+    parts = [
+        f"Se detectaron **{len(warnings)}** uso(s) de funciones/APIs deprecadas:\n",
+        "| Archivo | Linea | Lenguaje | Detalle |",
+        "|---------|-------|----------|---------|",
+        *[f"| `{w.file}` | {w.line} | {w.language} | {w.message} |" for w in shown],
+    ]
+    if len(warnings) > MAX_REPORTED:
+        parts.append(f"\n... y {len(warnings) - MAX_REPORTED} mas.")
 
-    return "\n".join(lines)
+    return "\n".join(parts)
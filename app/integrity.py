@@ -10,10 +10,14 @@ Validates:
 from __future__ import annotations
 
 import hashlib
+import mmap
 import os
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from pathlib import Path
+from typing import Callable, Iterable
 
 
 SECRET_PATTERNS = [
@@ -31,11 +35,91 @@ DEBUG_PATTERNS = [
     re.compile(r"\bdebugger\b"),
 ]
 
+# Literals, one of which must occur for the pattern at the same index to match
+# (lower-cased for case-insensitive patterns, exact case otherwise). Checked on
+# the raw bytes: a substring search is far cheaper than decoding plus a regex
+# search, and rules most patterns out for most files.
+SECRET_ANCHORS = [(b"api",), (b"passw", b"pwd"), (b"aws_",), (b"bearer",), (b"-----BEGIN",)]
+DEBUG_ANCHORS = [(b"console.log",), (b"debug",), (b"hack",), (b"debugger",)]
+
+MAX_SCAN_BYTES = 500_000
+
+_LETTER_OR_ESCAPE = re.compile(r"\\.|[A-Z]")
+_LEADING_BOUNDARY_WORD = re.compile(r"\\b([A-Za-z_]\w*)(?![?*+{])")
+
+
+def _search_form(pattern: re.Pattern) -> tuple[re.Pattern, bool]:
+    """Equivalent pattern that ``re`` can search with its literal-prefix scan.
+
+    Two rewrites, both done once at import:
+      - IGNORECASE patterns become case-sensitive twins to run over lower-cased
+        text (``re`` folds every character while matching case-insensitively).
+        Escapes (``\\S``, ``\\W``...) are kept as is.
+      - A leading ``\\bword`` becomes ``word(?<!\\wword)``: same match, but the
+        pattern now starts with a literal, which ``re`` finds with a fast
+        substring search instead of trying the boundary at every position.
+
+    Patterns stay str patterns: ``.`` counts characters and ``\\b`` / ``\\w``
+    are Unicode-aware, as they were on the text-mode read.
+
+    Returns the pattern to search and whether it expects lower-cased text.
+    """
+    source = pattern.pattern
+    flags = pattern.flags
+    folded = bool(flags & re.IGNORECASE)
+    if folded:
+        source = _LETTER_OR_ESCAPE.sub(
+            lambda m: m.group() if m.group().startswith("\\") else m.group().lower(),
+            source.removeprefix("(?i)"),
+        )
+        flags &= ~re.IGNORECASE
+
+    match = _LEADING_BOUNDARY_WORD.match(source)
+    if match:
+        word = match.group(1)
+        source = f"{word}(?<!\\w{word}){source[match.end():]}"
+
+    if source == pattern.pattern and flags == pattern.flags:
+        return pattern, False
+    return re.compile(source, flags), folded
+
+
+# (reported pattern, pattern actually searched, searches lower-cased text?, anchors)
+_SECRET_CHECKS = [(p, *_search_form(p), a) for p, a in zip(SECRET_PATTERNS, SECRET_ANCHORS)]
+_DEBUG_CHECKS = [(p, *_search_form(p), a) for p, a in zip(DEBUG_PATTERNS, DEBUG_ANCHORS)]
+
 BINARY_EXTENSIONS = {".exe", ".dll", ".so", ".dylib", ".bin", ".zip", ".tar", ".gz"}
 MAX_FILE_SIZE_MB = 10
+MAX_FILE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+
+# Hashed but never scanned for content (hidden directories are skipped as well)
+SCAN_EXCLUDED_DIRS = frozenset({"node_modules", "__pycache__", "venv"})
+
+# File reads and SHA-256 release the GIL, so tree hashing scales over threads;
+# small trees are hashed inline.
+HASH_WORKERS = int(os.getenv("INTEGRITY_HASH_WORKERS", "0")) or os.cpu_count() or 1
+PARALLEL_MIN_FILES = 32
+
+# Files at least this large are hashed straight from a read-only mapping
+# instead of being copied into a bytes object first.
+MMAP_MIN_BYTES = 16 * 1024
+
+# Content-scan findings are remembered by file SHA-256 (LRU, in process), so
+# files unchanged since an earlier push only cost the hash.
+SCAN_CACHE_SIZE = int(os.getenv("INTEGRITY_SCAN_CACHE_SIZE", "100000"))
 
 
-@dataclass
+# (absolute path, relative path, in content-scan scope?)
+FileTarget = tuple[str, str, bool]
+
+# (secret found?, detail of the debug leftover found or None)
+Findings = tuple[bool, str | None]
+
+_scan_cache: OrderedDict[str, Findings] = OrderedDict()
+_scan_cache_lock = threading.Lock()
+
+
+@dataclass(slots=True, frozen=True)
 class IntegrityIssue:
     file: str
     issue_type: str  # secret | debug | binary | size
@@ -43,7 +127,7 @@ class IntegrityIssue:
     severity: str  # warning | critical
 
 
-@dataclass
+@dataclass(slots=True)
 class IntegrityResult:
     status: str = "pass"  # pass | fail
     content_hash: str = ""
@@ -55,100 +139,239 @@ class IntegrityResult:
         return any(i.severity == "critical" for i in self.issues)
 
 
-def compute_tree_hash(directory: str) -> str:
-    """SHA-256 hash of all source file contents (sorted by path for determinism)."""
-    hasher = hashlib.sha256()
-    file_hashes = []
+def _list_files(directory: str) -> list[FileTarget]:
+    """Every file outside ``.git``, in tree-hash order (directories by path, files by name).
 
-    for root, _, files in sorted(os.walk(directory)):
-        if ".git" in Path(root).parts:
+    Each entry is ``(absolute path, relative path, in content-scan scope?)``;
+    hidden and ``SCAN_EXCLUDED_DIRS`` subtrees are hashed but not scanned.
+    Walks with ``os.scandir`` so entry types come from the directory listing,
+    and decides scan scope once per directory as it descends.
+    """
+    listing = []
+    stack = [(directory, "", True)]
+    while stack:
+        root, prefix, scan = stack.pop()
+        files = []
+        try:
+            it = os.scandir(root)
+        except OSError:
             continue
-        for fname in sorted(files):
-            fpath = os.path.join(root, fname)
-            try:
-                with open(fpath, "rb") as f:
-                    content = f.read()
-                file_hash = hashlib.sha256(content).hexdigest()
-                rel_path = os.path.relpath(fpath, directory)
-                file_hashes.append(f"{rel_path}:{file_hash}")
-            except OSError:
-                continue
-
-    hasher.update("\n".join(file_hashes).encode())
+        with it:
+            for entry in it:
+                name = entry.name
+                # Repository metadata: a directory in a clone, a file in a worktree
+                if name == ".git":
+                    continue
+                # Like os.walk: symlinked dirs are listed as dirs but not followed
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        child_scan = scan and not (name.startswith(".") or name in SCAN_EXCLUDED_DIRS)
+                        stack.append((entry.path, prefix + name + os.sep, child_scan))
+                else:
+                    files.append((name, entry.path))
+        listing.append((root, prefix, scan, files))
+
+    listing.sort(key=lambda d: d[0])
+    return [
+        (fpath, prefix + fname, scan)
+        for _, prefix, scan, files in listing
+        for fname, fpath in sorted(files)
+    ]
+
+
+def _map_threads(func: Callable, items: list) -> list:
+    """``map`` over a thread pool for larger batches; results keep input order."""
+    if HASH_WORKERS <= 1 or len(items) < PARALLEL_MIN_FILES:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="integrity") as ex:
+        return list(ex.map(func, items))
+
+
+def _tree_digest(rel_paths: Iterable[str], file_hashes: Iterable[str | None]) -> str:
+    """Roll per-file hashes up into the tree hash (unreadable files are left out)."""
+    hasher = hashlib.sha256()
+    hasher.update("\n".join(
+        f"{rel_path}:{file_hash}"
+        for rel_path, file_hash in zip(rel_paths, file_hashes)
+        if file_hash is not None
+    ).encode())
     return hasher.hexdigest()
 
 
+def compute_tree_hash(directory: str) -> str:
+    """SHA-256 hash of all source file contents (sorted by path for determinism).
+
+    ``hashlib.sha256`` is OpenSSL's implementation, which already uses the
+    SHA-NI / AVX2 code paths when the CPU has them. Files are listed first,
+    then hashed on a thread pool.
+    """
+    files = _list_files(directory)
+    file_hashes = _map_threads(_hash_file, [fpath for fpath, _, _ in files])
+    return _tree_digest((rel_path for _, rel_path, _ in files), file_hashes)
+
+
+def _hash_file(fpath: str) -> str | None:
+    """Hex SHA-256 of one file, or ``None`` if it can't be read."""
+    try:
+        with open(fpath, "rb") as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return hashlib.sha256(mm).hexdigest()
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
 def validate_integrity(directory: str) -> IntegrityResult:
-    """Run all integrity checks on a directory."""
-    result = IntegrityResult()
-    result.content_hash = compute_tree_hash(directory)
+    """Run all integrity checks on a directory.
 
-    for root, _, files in os.walk(directory):
-        if any(part.startswith(".") or part in ("node_modules", "__pycache__", "venv")
-               for part in Path(root).parts):
-            continue
+    A single walk feeds both the tree hash and the content checks, and each
+    file is read once for both.
+    """
+    result = IntegrityResult()
+    files = _list_files(directory)
+    outcomes = _map_threads(_inspect_file, files)
 
-        for fname in files:
-            fpath = os.path.join(root, fname)
-            rel_path = os.path.relpath(fpath, directory)
+    result.content_hash = _tree_digest(
+        (rel_path for _, rel_path, _ in files),
+        (file_hash for file_hash, _ in outcomes),
+    )
+    for (_, _, scan), (_, issues) in zip(files, outcomes):
+        if scan:
             result.files_scanned += 1
+            result.issues.extend(issues)
+
+    if result.has_critical:
+        result.status = "fail"
+
+    return result
+
 
-            ext = Path(fname).suffix.lower()
+def _inspect_file(target: FileTarget) -> tuple[str | None, list[IntegrityIssue]]:
+    """Hash one file and, when it is in scan scope, run the per-file checks on it.
 
-            # Check binary files
-            if ext in BINARY_EXTENSIONS:
-                result.issues.append(IntegrityIssue(
+    Checks go cheapest first: extension (from the name), size (from the fstat
+    of the handle that is opened anyway), content last.
+    """
+    fpath, rel_path, scan = target
+    issues: list[IntegrityIssue] = []
+
+    # Check binary files
+    if scan:
+        dot = fpath.rfind(".")
+        ext = fpath[dot:].lower() if dot > fpath.rfind(os.sep) + 1 else ""
+        if ext in BINARY_EXTENSIONS:
+            issues.append(IntegrityIssue(
+                file=rel_path,
+                issue_type="binary",
+                detail=f"Binary file detected: {ext}",
+                severity="warning",
+            ))
+            scan = False
+
+    try:
+        with open(fpath, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+
+            # Check file size
+            if scan and size > MAX_FILE_BYTES:
+                issues.append(IntegrityIssue(
                     file=rel_path,
-                    issue_type="binary",
-                    detail=f"Binary file detected: {ext}",
+                    issue_type="size",
+                    detail=f"File too large: {size / (1024 * 1024):.1f}MB (limit {MAX_FILE_SIZE_MB}MB)",
                     severity="warning",
                 ))
-                continue
+                scan = False
 
-            # Check file size
-            try:
-                size_mb = os.path.getsize(fpath) / (1024 * 1024)
-                if size_mb > MAX_FILE_SIZE_MB:
-                    result.issues.append(IntegrityIssue(
-                        file=rel_path,
-                        issue_type="size",
-                        detail=f"File too large: {size_mb:.1f}MB (limit {MAX_FILE_SIZE_MB}MB)",
-                        severity="warning",
-                    ))
-                    continue
-            except OSError:
-                continue
-
-            # Scan text content
-            try:
-                with open(fpath, "r", errors="ignore") as f:
-                    content = f.read(500_000)  # cap read to 500KB
-            except OSError:
-                continue
-
-            # Secret detection
-            for pattern in SECRET_PATTERNS:
-                if pattern.search(content):
-                    result.issues.append(IntegrityIssue(
-                        file=rel_path,
-                        issue_type="secret",
-                        detail=f"Potential secret/credential detected",
-                        severity="critical",
-                    ))
-                    break  # one secret issue per file is enough
-
-            # Debug leftover detection
-            for pattern in DEBUG_PATTERNS:
-                if pattern.search(content):
-                    result.issues.append(IntegrityIssue(
-                        file=rel_path,
-                        issue_type="debug",
-                        detail=f"Debug code detected: {pattern.pattern[:40]}",
-                        severity="warning",
-                    ))
-                    break
+            findings = None
+            if size >= MMAP_MIN_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    file_hash = hashlib.sha256(mm).hexdigest()
+                    if scan:
+                        findings = _content_findings(mm, file_hash)
+            else:
+                raw = f.read()
+                file_hash = hashlib.sha256(raw).hexdigest()
+                if scan:
+                    findings = _content_findings(raw, file_hash)
+    except OSError:
+        return None, issues
 
-    if result.has_critical:
-        result.status = "fail"
+    if findings is not None:
+        secret, debug_detail = findings
+        if secret:
+            issues.append(IntegrityIssue(
+                file=rel_path,
+                issue_type="secret",
+                detail=f"Potential secret/credential detected",
+                severity="critical",
+            ))
+        if debug_detail:
+            issues.append(IntegrityIssue(
+                file=rel_path,
+                issue_type="debug",
+                detail=debug_detail,
+                severity="warning",
+            ))
+    return file_hash, issues
 
-    return result
+
+def _content_findings(data: bytes | mmap.mmap, file_hash: str) -> Findings:
+    """Scan findings for a file, reused from ``_scan_cache`` when its hash was seen."""
+    with _scan_cache_lock:
+        findings = _scan_cache.get(file_hash)
+        if findings is not None:
+            _scan_cache.move_to_end(file_hash)
+            return findings
+
+    findings = _scan_content(data[:MAX_SCAN_BYTES])
+    if SCAN_CACHE_SIZE > 0:
+        with _scan_cache_lock:
+            _scan_cache[file_hash] = findings
+            if len(_scan_cache) > SCAN_CACHE_SIZE:
+                _scan_cache.popitem(last=False)
+    return findings
+
+
+def _scan_content(raw: bytes) -> Findings:
+    """Secret / debug-leftover checks over the first ``MAX_SCAN_BYTES`` of a file."""
+    if not raw.isascii():
+        # Case-insensitive matching folds some non-ASCII letters onto ASCII ones
+        # ("ſ" matches "s") and the lenient decode drops invalid bytes, so the
+        # anchors and lower-cased twins aren't exact here: run the patterns as is
+        content = _as_text(raw)
+        secret = any(pattern.search(content) for pattern in SECRET_PATTERNS)
+        debug = next((pattern for pattern in DEBUG_PATTERNS if pattern.search(content)), None)
+        return secret, debug and f"Debug code detected: {debug.pattern[:40]}"
+
+    lowered = raw.lower()
+    # Case-sensitive patterns test their exact-case anchors on the raw bytes,
+    # which rules out more files (e.g. "-----begin" prose vs. a PEM header)
+    secret_candidates = [c for c in _SECRET_CHECKS if any(a in (lowered if c[2] else raw) for a in c[3])]
+    debug_candidates = [c for c in _DEBUG_CHECKS if any(a in (lowered if c[2] else raw) for a in c[3])]
+    candidates = secret_candidates + debug_candidates
+    if not candidates:
+        return False, None
+
+    content = _as_text(raw) if not all(c[2] for c in candidates) else ""
+    folded = _as_text(lowered) if any(c[2] for c in candidates) else ""
+
+    # Secret detection (one secret issue per file is enough)
+    secret = any(search.search(folded if on_folded else content) for _, search, on_folded, _ in secret_candidates)
+
+    # Debug leftover detection
+    debug_detail = None
+    for pattern, search, on_folded, _ in debug_candidates:
+        if search.search(folded if on_folded else content):
+            debug_detail = f"Debug code detected: {pattern.pattern[:40]}"
+            break
+
+    return secret, debug_detail
+
+
+def _as_text(raw: bytes) -> str:
+    """Decode like a text-mode read would: lenient UTF-8 + universal newlines."""
+    content = raw.decode("utf-8", errors="ignore")
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content
@@ -0,0 +1,136 @@
+"""
+Cached repository checkouts.
+
+Every push used to be cloned from scratch into a temp directory. Instead a
+bare, blobless clone is kept per repository under REPO_CACHE_DIR: a push only
+fetches what changed since the last one and is checked out as its own
+``git worktree``, which is removed again once the analysis is done.
+
+With REPO_CACHE_DIR unset (the default outside Docker) or not writable, each
+push gets a shallow clone instead.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+from typing import Iterator
+
+
+REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR", "")
+GIT_TIMEOUT = 300
+
+# Git never waits on a credentials prompt (there is no terminal): a private
+# or mistyped repo URL fails right away instead of hanging until the timeout.
+GIT_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+# Branches only: a mirror clone would also pull every refs/pull/* from GitHub
+BRANCH_REFSPEC = "+refs/heads/*:refs/heads/*"
+
+
+# Refs and URLs come from the push payload: every command puts them after
+# --end-of-options so that none of them can be taken as an option.
+
+def _git(*args: str) -> None:
+    # Only the exit status matters: stdout goes straight to /dev/null instead
+    # of being buffered in Python, stderr is kept for the error message.
+    subprocess.run(
+        ["git", *args], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        timeout=GIT_TIMEOUT, check=True, env=GIT_ENV,
+    )
+
+
+def _has_commit(repo: str, rev: str) -> bool:
+    result = subprocess.run(
+        ["git", "-C", repo, "rev-parse", "--verify", "--quiet", "--end-of-options", f"{rev}^{{commit}}"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=GIT_TIMEOUT, env=GIT_ENV,
+    )
+    return result.returncode == 0
+
+
+def mirror_path(repo_url: str) -> str:
+    return os.path.join(REPO_CACHE_DIR, hashlib.sha1(repo_url.encode()).hexdigest() + ".git")
+
+
+@contextmanager
+def _locked(mirror: str) -> Iterator[None]:
+    """Serialize fetches and worktree changes on one mirror across workers."""
+    with open(mirror + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _shallow_clone(repo_url: str, branch: str, rev: str, work_dir: str) -> None:
+    """Check ``rev`` out into ``work_dir`` with as little history as possible."""
+    # Only the commit and its parent are needed (tree scan + HEAD~1 diff), and
+    # blobs are fetched for the checked-out tree rather than all history.
+    _git("init", "--quiet", work_dir)
+    _git("-C", work_dir, "remote", "add", "--end-of-options", "origin", repo_url)
+    _git("-C", work_dir, "fetch", "--depth", "2", "--filter=blob:none", "--end-of-options", "origin", branch)
+    target = "FETCH_HEAD"
+    if rev != branch:
+        if _has_commit(work_dir, rev):
+            target = rev
+        else:
+            # Not the branch tip any more (a later push moved it): ask for the commit itself
+            _git("-C", work_dir, "fetch", "--depth", "2", "--filter=blob:none", "--end-of-options", "origin", rev)
+    # switch, unlike checkout --detach, accepts --end-of-options
+    _git("-C", work_dir, "switch", "--quiet", "--detach", "--end-of-options", target)
+
+
+def checkout(repo_url: str, branch: str, rev: str, work_dir: str) -> str | None:
+    """Check ``rev`` of ``repo_url`` out into the empty directory ``work_dir``.
+
+    Returns the cached repository the worktree belongs to (hand it back to
+    ``release``), or ``None`` when a shallow clone was made instead.
+    Raises ``subprocess.CalledProcessError`` if git fails.
+    """
+    mirror = mirror_path(repo_url) if REPO_CACHE_DIR else None
+    if mirror is not None:
+        try:
+            os.makedirs(REPO_CACHE_DIR, exist_ok=True)
+        except OSError:
+            mirror = None  # e.g. the default path isn't writable outside Docker
+    if mirror is None:
+        _shallow_clone(repo_url, branch, rev, work_dir)
+        return None
+
+    with _locked(mirror):
+        fresh = not os.path.isdir(mirror)
+        if fresh:
+            _git("clone", "--bare", "--filter=blob:none", "--end-of-options", repo_url, mirror)
+        # Also narrows caches created earlier with clone --mirror (refs/*)
+        _git("-C", mirror, "config", "remote.origin.fetch", BRANCH_REFSPEC)
+        if not fresh:
+            # fetch also runs git's automatic maintenance (gc --auto)
+            _git("-C", mirror, "fetch", "--prune", "origin")
+        if not _has_commit(mirror, rev):
+            # No longer on any branch (force-pushed away): fetch the commit itself
+            _git("-C", mirror, "fetch", "--end-of-options", "origin", rev)
+        # Detached, so later fetches may move the branch this push came from
+        _git("-C", mirror, "worktree", "add", "--detach", "--force", "--end-of-options", work_dir, rev)
+    return mirror
+
+
+def release(mirror: str | None, work_dir: str) -> None:
+    """Remove a checkout made by ``checkout`` (never raises)."""
+    if mirror is not None:
+        try:
+            with _locked(mirror):
+                _git("-C", mirror, "worktree", "remove", "--force", work_dir)
+            return
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if mirror is not None:
+        # Drop the metadata of the worktree that could not be removed cleanly
+        try:
+            with _locked(mirror):
+                _git("-C", mirror, "worktree", "prune")
+        except (OSError, subprocess.SubprocessError):
+            pass
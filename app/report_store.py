@@ -0,0 +1,52 @@
+"""
+Markdown reports on disk.
+
+When REPORTS_DIR is set, each analysis' report is written to
+``REPORTS_DIR/<analysis id>.md`` instead of the ``md_report`` column, which is
+then left empty. Reports are usually the widest value in a commit_analyses
+row; keeping them out of the table keeps it small for the stats queries.
+
+Leave REPORTS_DIR unset where the filesystem isn't persistent (e.g. hosted
+platforms that redeploy from the image): reports then stay in the database.
+Rows stored before REPORTS_DIR was set keep their report in the column.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", "")
+
+
+def report_path(analysis_id: int) -> str | None:
+    """Where the report of ``analysis_id`` lives, or ``None`` when reports stay in the DB."""
+    if not REPORTS_DIR:
+        return None
+    return os.path.join(REPORTS_DIR, f"{analysis_id}.md")
+
+
+def save_report(analysis_id: int, report: str) -> str:
+    """Write a report atomically (temp file + rename); returns its path."""
+    path = report_path(analysis_id)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=REPORTS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(report)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+def delete_report(analysis_id: int) -> None:
+    """Remove a stored report, if any (never raises)."""
+    path = report_path(analysis_id)
+    if path is not None:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
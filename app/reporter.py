@@ -131,7 +131,7 @@ def generate_markdown_report(
     recs = generate_recommendations(metrics, integrity)
     now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
 
-    report = f"""# Code Metrics Report
+    parts = [f"""# Code Metrics Report
 
 > Generated: {now}
 
@@ -177,16 +177,18 @@ def generate_markdown_report(
 - **Status:** {integrity.status.upper()}
 - **Content Hash:** `{integrity.content_hash[:16]}...`
 - **Files Scanned:** {integrity.files_scanned}
-"""
+"""]
 
     if integrity.issues:
-        report += "\n### Issues Found\n\n"
-        report += "| File | Type | Severity | Detail |\n"
-        report += "|------|------|----------|--------|\n"
-        for issue in integrity.issues:
-            report += f"| `{issue.file}` | {issue.issue_type} | **{issue.severity}** | {issue.detail} |\n"
+        parts.append("\n### Issues Found\n\n")
+        parts.append("| File | Type | Severity | Detail |\n")
+        parts.append("|------|------|----------|--------|\n")
+        parts.extend(
+            f"| `{issue.file}` | {issue.issue_type} | **{issue.severity}** | {issue.detail} |\n"
+            for issue in integrity.issues
+        )
 
-    report += f"""
+    parts.append(f"""
 ---
 
 ## Opinion
@@ -197,14 +199,13 @@ def generate_markdown_report(
 
 ## Recommendations
 
-"""
-    for i, rec in enumerate(recs, 1):
-        report += f"{i}. {rec}\n"
+""")
+    parts.extend(f"{i}. {rec}\n" for i, rec in enumerate(recs, 1))
 
-    report += f"""
+    parts.append("""
 ---
 
 *Report generated by Code Metrics v1.0*
-"""
+""")
 
-    return report
+    return "".join(parts)
@@ -6,10 +6,11 @@ All endpoints return data shaped for Chart.js and support date filtering.
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from functools import lru_cache
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import func
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 from app.database import (
@@ -19,7 +20,13 @@ from app.database import (
 
 router = APIRouter(tags=["statistics"])
 
+# Batch size for endpoints that walk many rows (see Query.yield_per)
+STREAM_BATCH_ROWS = 1000
 
+
+# Dashboards send the same few range strings over and over; datetimes are
+# immutable, so parsed values can be shared between requests.
+@lru_cache(maxsize=1024)
 def _parse_date(date_str: str | None) -> datetime | None:
     if not date_str:
         return None
@@ -35,11 +42,12 @@ def _parse_date(date_str: str | None) -> datetime | None:
 def _apply_date_filter(query, model, from_date: str | None, to_date: str | None):
     fd = _parse_date(from_date)
     td = _parse_date(to_date)
+    conds = []
     if fd:
-        query = query.filter(model.timestamp >= fd)
+        conds.append(model.timestamp >= fd)
     if td:
-        query = query.filter(model.timestamp <= td)
-    return query
+        conds.append(model.timestamp <= td)
+    return query.filter(*conds) if conds else query
 
 
 # ── Developers list (for dropdown) ────────────────────────────
@@ -109,8 +117,16 @@ def get_score_evolution(
     to_date: str | None = None,
     db: Session = Depends(get_db),
 ):
+    # Only the plotted columns, as plain rows
     query = (
-        db.query(CommitAnalysis)
+        db.query(
+            CommitAnalysis.author,
+            CommitAnalysis.timestamp,
+            CommitAnalysis.quality_score,
+            CommitAnalysis.complexity_avg,
+            CommitAnalysis.maintainability_index,
+        )
+        .filter(CommitAnalysis.author.isnot(None), CommitAnalysis.author != "")
         .order_by(CommitAnalysis.timestamp.asc())
     )
     if repo:
@@ -119,17 +135,16 @@ def get_score_evolution(
         query = query.filter(CommitAnalysis.author == developer)
     query = _apply_date_filter(query, CommitAnalysis, from_date, to_date)
 
-    results = query.all()
-
     # Group by developer
     dev_data: dict[str, dict] = {}
     all_labels: list[str] = []
+    seen_labels: set[str] = set()
 
-    for r in results:
-        if not r.author:
-            continue
+    # Rows arrive in batches (server-side cursor on Postgres) instead of as one list
+    for r in query.yield_per(STREAM_BATCH_ROWS):
         label = r.timestamp.strftime("%Y-%m-%d %H:%M") if r.timestamp else ""
-        if label not in all_labels:
+        if label not in seen_labels:
+            seen_labels.add(label)
             all_labels.append(label)
 
         if r.author not in dev_data:
@@ -156,34 +171,43 @@ def get_push_activity(
     to_date: str | None = None,
     db: Session = Depends(get_db),
 ):
-    query = db.query(CommitAnalysis).order_by(CommitAnalysis.timestamp.asc())
+    # The database counts per (day, developer); days are folded into ISO
+    # weeks here since week numbering differs between SQL dialects.
+    day = func.date(CommitAnalysis.timestamp)
+    query = (
+        db.query(
+            day.label("day"),
+            CommitAnalysis.author,
+            func.count(CommitAnalysis.id).label("pushes"),
+            func.sum(CommitAnalysis.lines_added).label("lines_added"),
+        )
+        .filter(
+            CommitAnalysis.author.isnot(None), CommitAnalysis.author != "",
+            CommitAnalysis.timestamp.isnot(None),
+        )
+        .group_by(day, CommitAnalysis.author)
+        .order_by(day)
+    )
     if repo:
         query = query.filter(CommitAnalysis.repo_name == repo)
     if developer:
         query = query.filter(CommitAnalysis.author == developer)
     query = _apply_date_filter(query, CommitAnalysis, from_date, to_date)
 
-    results = query.all()
-
-    # Group by week and developer
+    # Group by week and developer (dicts keep first-seen week order)
     week_dev: dict[str, dict[str, dict]] = {}
-    week_order: list[str] = []
 
-    for r in results:
-        if not r.author or not r.timestamp:
-            continue
-        iso = r.timestamp.isocalendar()
+    for r in query.yield_per(STREAM_BATCH_ROWS):
+        # SQLite returns date() as text
+        d = date.fromisoformat(r.day) if isinstance(r.day, str) else r.day
+        iso = d.isocalendar()
         week_label = f"{iso[0]}-W{iso[1]:02d}"
-        if week_label not in week_order:
-            week_order.append(week_label)
 
-        if week_label not in week_dev:
-            week_dev[week_label] = {}
-        if r.author not in week_dev[week_label]:
-            week_dev[week_label][r.author] = {"pushes": 0, "lines_added": 0}
+        counts = week_dev.setdefault(week_label, {}).setdefault(r.author, {"pushes": 0, "lines_added": 0})
+        counts["pushes"] += r.pushes
+        counts["lines_added"] += r.lines_added or 0
 
-        week_dev[week_label][r.author]["pushes"] += 1
-        week_dev[week_label][r.author]["lines_added"] += r.lines_added or 0
+    week_order = list(week_dev)
 
     # Build datasets per developer
     all_devs = sorted({dev for week in week_dev.values() for dev in week})
@@ -207,25 +231,22 @@ def get_quality_distribution(
     to_date: str | None = None,
     db: Session = Depends(get_db),
 ):
-    query = db.query(CommitAnalysis.quality_score)
+    # Bucketed and counted by the database: one row per non-empty bucket
+    score = CommitAnalysis.quality_score
+    bucket = case(
+        (score >= 90, "A (90-100)"),
+        (score >= 80, "B (80-89)"),
+        (score >= 70, "C (70-79)"),
+        (score >= 60, "D (60-69)"),
+        else_="F (0-59)",
+    ).label("bucket")
+    query = db.query(bucket, func.count()).filter(score.isnot(None)).group_by(bucket)
     if repo:
         query = query.filter(CommitAnalysis.repo_name == repo)
     query = _apply_date_filter(query, CommitAnalysis, from_date, to_date)
 
-    scores = [r[0] for r in query.all() if r[0] is not None]
-
     buckets = {"A (90-100)": 0, "B (80-89)": 0, "C (70-79)": 0, "D (60-69)": 0, "F (0-59)": 0}
-    for s in scores:
-        if s >= 90:
-            buckets["A (90-100)"] += 1
-        elif s >= 80:
-            buckets["B (80-89)"] += 1
-        elif s >= 70:
-            buckets["C (70-79)"] += 1
-        elif s >= 60:
-            buckets["D (60-69)"] += 1
-        else:
-            buckets["F (0-59)"] += 1
+    buckets.update(query.all())
 
     return {
         "labels": list(buckets.keys()),
@@ -0,0 +1,94 @@
+"""
+Single-pass source scanner.
+
+Reads every file in the checkout once and derives both the per-file metrics
+(see analyzer.py) and the deprecation hits (see deprecation_detector.py) from
+the same bytes, instead of walking and reading the tree twice.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Iterator
+
+from app.analyzer import (
+    ANALYZABLE_EXTENSIONS, EXCLUDED_DIRS, MAX_FILE_BYTES,
+    CommitMetrics, FileMetrics, analyze_content, file_extension, map_files, summarize_files,
+)
+from app.deprecation_detector import EXCLUDED_DIRS as DEPRECATION_EXCLUDED_DIRS
+from app.deprecation_detector import DeprecationWarning, scan_content
+
+
+# (path, extension, compute metrics?, scan for deprecations?)
+ScanTarget = tuple[str, str, bool, bool]
+
+
+@dataclass(slots=True)
+class ScanResult:
+    metrics: CommitMetrics
+    deprecations: list[DeprecationWarning] = field(default_factory=list)
+
+
+def _iter_targets(directory: str) -> Iterator[ScanTarget]:
+    """Walk ``directory`` once, tagging each file with the scans it needs.
+
+    The deprecation scan skips more directories (dist/, build/) than the
+    analyzer, so those subtrees are still entered but only for metrics.
+    """
+    stack = [(directory, True)]
+    while stack:
+        path, check_deprecations = stack.pop()
+        try:
+            it = os.scandir(path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not name.startswith(".") and name not in EXCLUDED_DIRS:
+                        stack.append((entry.path, check_deprecations and name not in DEPRECATION_EXCLUDED_DIRS))
+                    continue
+                if not entry.is_file():
+                    continue
+
+                ext = file_extension(name)
+                analyze = ext in ANALYZABLE_EXTENSIONS
+                if analyze:
+                    try:
+                        analyze = entry.stat().st_size <= MAX_FILE_BYTES
+                    except OSError:
+                        analyze = False
+                # Skip self-detection (the detector holds patterns as strings, not usage)
+                deprecations = check_deprecations and name != "deprecation_detector.py"
+                if analyze or deprecations:
+                    yield entry.path, ext, analyze, deprecations
+
+
+def scan_file(target: ScanTarget, directory: str) -> tuple[FileMetrics | None, list[DeprecationWarning]]:
+    """Read one file and run the scans it was tagged for (runs in a worker process)."""
+    path, ext, analyze, deprecations = target
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None, []
+
+    fm = analyze_content(path, ext, raw) if analyze else None
+    warnings = scan_content(raw, ext, os.path.relpath(path, directory)) if deprecations else []
+    return fm, warnings
+
+
+def scan_directory(directory: str, collect_details: bool = False) -> ScanResult:
+    """Aggregate metrics and deprecation warnings for a checkout in one pass.
+
+    Per-file metrics are only kept in ``metrics.file_details`` when
+    ``collect_details`` is set.
+    """
+    results = map_files(partial(scan_file, directory=directory), list(_iter_targets(directory)))
+    return ScanResult(
+        metrics=summarize_files((fm for fm, _ in results), collect_details),
+        deprecations=[w for _, file_warnings in results for w in file_warnings],
+    )
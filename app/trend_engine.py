@@ -11,10 +11,10 @@ from dataclasses import dataclass
 
 from sqlalchemy.orm import Session
 
-from app.database import CodebaseSnapshot
+from app.database import LatestSnapshot
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TrendAnalysis:
     direction: str  # improving | stable | declining
     quality_delta: float
@@ -25,6 +25,29 @@ class TrendAnalysis:
     current_score: float
 
 
+# Score change (points) beyond which a push counts as improving/declining
+_DIR_THRESHOLD = 1.0
+_DIRECTIONS = ("declining", "stable", "improving")
+
+# Summary sentences, pre-joined per (direction, lines changed?, complexity
+# changed?) so compute_trend formats a single template
+_QUALITY_PARTS = {
+    "improving": "Calidad mejoro {qd:+.1f} puntos ({prev:.1f} -> {cur:.1f})",
+    "declining": "Calidad bajo {qd:+.1f} puntos ({prev:.1f} -> {cur:.1f})",
+    "stable": "Calidad estable en {cur:.1f}",
+}
+_LINES_PART = "Codebase {lines_verb} en {ld} lineas"
+_COMPLEXITY_PART = "Complejidad {complexity_verb} en {cd:.1f}"
+_SUMMARY_TEMPLATES = {
+    (direction, lines, complexity): ". ".join(
+        [quality] + [_LINES_PART] * lines + [_COMPLEXITY_PART] * complexity
+    ) + "."
+    for direction, quality in _QUALITY_PARTS.items()
+    for lines in (False, True)
+    for complexity in (False, True)
+}
+
+
 def compute_trend(
     db: Session,
     repo_name: str,
@@ -34,12 +57,7 @@ def compute_trend(
     current_lines: int,
 ) -> TrendAnalysis:
     """Compare current metrics against the most recent baseline snapshot."""
-    previous = (
-        db.query(CodebaseSnapshot)
-        .filter_by(repo_name=repo_name, branch=branch)
-        .order_by(CodebaseSnapshot.timestamp.desc())
-        .first()
-    )
+    previous = db.get(LatestSnapshot, (repo_name, branch))
 
     if not previous:
         return TrendAnalysis(
@@ -52,37 +70,32 @@ def compute_trend(
             current_score=current_score,
         )
 
-    quality_delta = current_score - previous.quality_score
-    complexity_delta = current_complexity - previous.complexity_avg
+    # Rounded once: the stored deltas, the thresholds and the summary all see
+    # the same value (scores carry 1 decimal, complexity 2; the rest is float noise)
+    quality_delta = round(current_score - previous.quality_score, 2)
+    complexity_delta = round(current_complexity - previous.complexity_avg, 2)
     lines_delta = current_lines - previous.total_lines
 
-    if quality_delta > 1.0:
-        direction = "improving"
-    elif quality_delta < -1.0:
-        direction = "declining"
-    else:
-        direction = "stable"
-
-    parts = []
-    if direction == "improving":
-        parts.append(f"Calidad mejoro {quality_delta:+.1f} puntos ({previous.quality_score:.1f} -> {current_score:.1f})")
-    elif direction == "declining":
-        parts.append(f"Calidad bajo {quality_delta:+.1f} puntos ({previous.quality_score:.1f} -> {current_score:.1f})")
-    else:
-        parts.append(f"Calidad estable en {current_score:.1f}")
-
-    if abs(lines_delta) > 50:
-        parts.append(f"Codebase {'crecio' if lines_delta > 0 else 'se redujo'} en {abs(lines_delta)} lineas")
+    direction = _DIRECTIONS[(quality_delta > _DIR_THRESHOLD) - (quality_delta < -_DIR_THRESHOLD) + 1]
 
-    if abs(complexity_delta) > 0.5:
-        parts.append(f"Complejidad {'aumento' if complexity_delta > 0 else 'disminuyo'} en {abs(complexity_delta):.1f}")
+    abs_lines = abs(lines_delta)
+    abs_complexity = abs(complexity_delta)
+    summary = _SUMMARY_TEMPLATES[direction, abs_lines > 50, abs_complexity > 0.5].format_map({
+        "qd": quality_delta,
+        "prev": previous.quality_score,
+        "cur": current_score,
+        "ld": abs_lines,
+        "lines_verb": "crecio" if lines_delta > 0 else "se redujo",
+        "cd": abs_complexity,
+        "complexity_verb": "aumento" if complexity_delta > 0 else "disminuyo",
+    })
 
     return TrendAnalysis(
         direction=direction,
-        quality_delta=round(quality_delta, 2),
-        complexity_delta=round(complexity_delta, 2),
+        quality_delta=quality_delta,
+        complexity_delta=complexity_delta,
         lines_delta=lines_delta,
-        summary=". ".join(parts) + ".",
+        summary=summary,
         previous_score=previous.quality_score,
         current_score=current_score,
     )
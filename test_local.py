@@ -15,6 +15,9 @@ Usage:
 
 import json
 import os
+import re
+import signal
+import socket
 import subprocess
 import sys
 import time
@@ -24,42 +27,68 @@ import webbrowser
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 os.environ.setdefault("DATABASE_URL", f"sqlite:///{PROJECT_DIR}/data/metrics.db")
 
-# Load .env if exists
+# Load .env if exists: KEY=value lines, optional "export ", quoted values
+# and trailing comments (python-dotenv isn't a dependency)
+_ENV_LINE = re.compile(
+    r"""^\s*(?:export\s+)?([A-Za-z_]\w*)\s*=\s*(?:"([^"]*)"|'([^']*)'|(.*?))\s*(?:\s#.*)?$"""
+)
 env_path = os.path.join(PROJECT_DIR, ".env")
 if os.path.exists(env_path):
     with open(env_path) as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#") and "=" in line:
-                key, val = line.split("=", 1)
-                os.environ.setdefault(key, val)
+        for match in map(_ENV_LINE.match, f):
+            if match:
+                key, double, single, bare = match.groups()
+                os.environ.setdefault(key, double if double is not None else single if single is not None else bare)
 
 import httpx
 
-BASE_URL = "http://localhost:8080"
+SERVER_HOST = "localhost"
+SERVER_PORT = 8080
+BASE_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
 
 # Use authenticated user's repo
 TEST_REPO = "practisistemas/code-metrics-test"
 TEST_REPO_URL = f"https://github.com/{TEST_REPO}.git"
 
+SERVER_SCRIPT = f"""
+from app.database import init_db
+init_db()
+print("  Database ready")
 
-def wait_for_server(timeout=15):
+import uvicorn
+uvicorn.run("app.main:app", host="0.0.0.0", port={SERVER_PORT})
+"""
+
+
+def wait_for_server(client, timeout=15):
     """Wait for the FastAPI server to be ready."""
     print("Waiting for server...")
-    for _ in range(timeout):
+    # Poll the port itself in short steps: uvicorn only listens once startup
+    # is done, so the first accepted connection means the app is up
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
         try:
-            r = httpx.get(f"{BASE_URL}/health", timeout=2)
-            if r.status_code == 200:
-                print(f"  Server ready: {r.json()}")
-                return True
-        except httpx.ConnectError:
-            pass
-        time.sleep(1)
-    print("  ERROR: Server did not start in time")
-    return False
-
-
-def test_analyze():
+            socket.create_connection((SERVER_HOST, SERVER_PORT), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        print("  ERROR: Server did not start in time")
+        return False
+
+    try:
+        r = client.get("/health", timeout=2)
+    except httpx.HTTPError as e:
+        print(f"  ERROR: Health check failed: {e}")
+        return False
+    if r.status_code != 200:
+        print(f"  ERROR: Health check returned {r.status_code}")
+        return False
+    print(f"  Server ready: {r.json()}")
+    return True
+
+
+def run_analyze(client):
     """Send a test push payload to the analyze endpoint."""
     payload = {
         "repo_name": TEST_REPO,
@@ -84,7 +113,7 @@ def test_analyze():
     print("  This may take 30-60s (clone + Claude review)...\n")
 
     try:
-        r = httpx.post(f"{BASE_URL}/api/analyze", json=payload, timeout=180)
+        r = client.post("/api/analyze", json=payload, timeout=180)
         print(f"  HTTP Status: {r.status_code}")
 
         if r.status_code == 200:
@@ -122,13 +151,14 @@ def test_analyze():
                     for s in review["suggestions"][:5]:
                         print(f"    - {s[:100]}")
 
-            # Download report
-            report_r = httpx.get(f"{BASE_URL}{data['report_url']}", timeout=10)
-            if report_r.status_code == 200:
-                report_path = os.path.join(PROJECT_DIR, "test-report.md")
-                with open(report_path, "w") as f:
-                    f.write(report_r.text)
-                print(f"\n  Report saved: {report_path}")
+            # Download report, written to disk as it arrives
+            with client.stream("GET", data["report_url"]) as report_r:
+                if report_r.status_code == 200:
+                    report_path = os.path.join(PROJECT_DIR, "test-report.md")
+                    with open(report_path, "wb") as f:
+                        for chunk in report_r.iter_bytes(65536):
+                            f.write(chunk)
+                    print(f"\n  Report saved: {report_path}")
 
             return data
         else:
@@ -139,9 +169,9 @@ def test_analyze():
         return None
 
 
-def test_results():
+def show_results(client):
     """Check stored results."""
-    r = httpx.get(f"{BASE_URL}/api/results", timeout=10)
+    r = client.get("/api/results")
     if r.status_code == 200:
         results = r.json()
         print(f"\n  Stored analyses: {len(results)}")
@@ -149,6 +179,21 @@ def test_results():
             print(f"    [{res['sha']}] Score: {res['quality_score']} | Integrity: {res['integrity']} | Claude: {'Yes' if res.get('has_claude_review') else 'No'}")
 
 
+def stop_server(proc, timeout=5):
+    """SIGTERM the server's process group; SIGKILL it if it doesn't exit in time."""
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            break
+        try:
+            proc.wait(timeout=timeout)
+            break
+        except subprocess.TimeoutExpired:
+            continue
+    proc.wait()
+
+
 def main():
     print("=" * 60)
     print("  CODE METRICS - Local Test")
@@ -158,28 +203,27 @@ def main():
     print(f"  API key: {'...' + api_key[-8:] if api_key else 'NOT SET'}")
     print(f"  DB: {os.environ.get('DATABASE_URL', 'default')}")
 
-    # Init database
-    print("\nInitializing database...")
-    sys.path.insert(0, PROJECT_DIR)
-    from app.database import init_db
-    init_db()
-    print("  Database ready")
-
-    # Start server
-    print("\nStarting server...")
+    # Init database and start the server in one child process (like
+    # scripts/entrypoint.sh), so the app modules are only imported there
+    print("\nInitializing database and starting server...")
+    # Own session: Ctrl+C only reaches this script, which then stops the
+    # server's whole process group (see stop_server)
     server_proc = subprocess.Popen(
-        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8080"],
+        [sys.executable, "-c", SERVER_SCRIPT],
         cwd=PROJECT_DIR,
         env={**os.environ},
+        start_new_session=True,
+        close_fds=True,
     )
 
+    # One client (and connection pool) for every request of the run
+    client = httpx.Client(base_url=BASE_URL, timeout=10)
     try:
-        if not wait_for_server():
-            server_proc.terminate()
+        if not wait_for_server(client):
             return
 
-        test_analyze()
-        test_results()
+        run_analyze(client)
+        show_results(client)
 
         print(f"\n  Dashboard: {BASE_URL}/")
         webbrowser.open(BASE_URL)
@@ -192,8 +236,8 @@ def main():
     except KeyboardInterrupt:
         print("\nStopping...")
     finally:
-        server_proc.terminate()
-        server_proc.wait()
+        client.close()
+        stop_server(server_proc)
         print("Done.")
 
 
@@ -0,0 +1,9 @@
+"""Point the app at a throwaway database before any test module imports it."""
+
+import os
+import tempfile
+
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='metrics-test-'), 'metrics.db')}",
+)
@@ -0,0 +1,87 @@
+"""
+POST /api/analyze of a commit analyzed recently: the stored analysis is
+reused unless ?force=1 is given or its Claude review failed.
+
+Runs the real pipeline on a local repository; Claude is stubbed.
+"""
+
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import claude_review, main
+from app.database import PushEvent, SessionLocal, init_db
+
+
+class FakeAnthropic:
+    def __init__(self, **kwargs):
+        self.messages = self
+
+    def create(self, **kwargs):
+        text = "## Opinion General\nBien.\n## Resumen\n8/10"
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db()
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def payload(tmp_path, request):
+    repo = tmp_path / "origin"
+    subprocess.run(["git", "init", "--quiet", "--initial-branch=main", str(repo)], check=True)
+    (repo / "app.py").write_text("def add(a, b):\n    return a + b\n")
+    git = ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run([*git, "add", "."], check=True)
+    subprocess.run([*git, "commit", "--quiet", "-m", "first"], check=True)
+    sha = subprocess.check_output([*git, "rev-parse", "HEAD"], text=True).strip()
+    return {
+        "repo_name": f"acme/{request.node.name}", "repo_url": f"file://{repo}", "branch": "main",
+        "head_sha": sha, "pusher": "dev", "commits": [{"sha": sha, "message": "first", "author": "dev"}],
+    }
+
+
+@pytest.fixture
+def claude(monkeypatch):
+    monkeypatch.setattr(claude_review, "ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr(claude_review.anthropic, "Anthropic", FakeAnthropic)
+
+
+def push_events(repo_name: str) -> int:
+    with SessionLocal() as db:
+        return db.query(PushEvent).filter_by(repo_name=repo_name).count()
+
+
+def test_recent_commit_is_reused(client, payload, claude):
+    first = client.post("/api/analyze", json=payload).json()
+    again = client.post("/api/analyze", json=payload).json()
+    assert "reused" not in first
+    assert again["reused"] is True
+    assert again["analysis_id"] == first["analysis_id"]
+    assert again["claude_review"] == first["claude_review"]
+    assert push_events(payload["repo_name"]) == 2
+
+
+def test_force_analyzes_again(client, payload, claude):
+    first = client.post("/api/analyze", json=payload).json()
+    forced = client.post("/api/analyze?force=1", json=payload).json()
+    assert "reused" not in forced
+    assert forced["analysis_id"] != first["analysis_id"]
+
+
+def test_failed_review_is_not_reused(client, payload, monkeypatch):
+    monkeypatch.setattr(claude_review, "ANTHROPIC_API_KEY", "")
+    first = client.post("/api/analyze", json=payload).json()
+    assert first["claude_review"]["summary"] == "No AI review available - API key missing"
+
+    monkeypatch.setattr(claude_review, "ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setattr(claude_review.anthropic, "Anthropic", FakeAnthropic)
+    again = client.post("/api/analyze", json=payload).json()
+    assert "reused" not in again
+    assert again["analysis_id"] != first["analysis_id"]
+    assert again["claude_review"]["summary"] == "8/10"
@@ -0,0 +1,39 @@
+"""
+The per-file analysis cache is shared by every thread of a process.
+"""
+
+import threading
+
+import pytest
+
+from app import analyzer_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(analyzer_cache, "CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(analyzer_cache, "_conn", None)
+    monkeypatch.setattr(analyzer_cache, "_disabled", False)
+    yield analyzer_cache
+    if analyzer_cache._conn is not None:
+        analyzer_cache._conn.close()
+
+
+def test_other_threads_share_the_cache(cache):
+    key = cache.cache_key(b"x = 1\n", ".py")
+    cache.store(key, 1, 1.0, 100.0)
+
+    found = []
+    threads = [threading.Thread(target=lambda: found.append(cache.lookup(key))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert found == [(1, 1.0, 100.0)] * 4
+
+
+def test_store_from_another_thread(cache):
+    thread = threading.Thread(target=cache.store, args=("k", 2, 3.0, 50.0))
+    thread.start()
+    thread.join()
+    assert cache.lookup("k") == (2, 3.0, 50.0)
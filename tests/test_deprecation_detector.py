@@ -0,0 +1,77 @@
+"""
+Differential test: scan_content against the original per-line scanner.
+
+The reference below is the scan loop detect_deprecations used before the
+combined regex: each line of the text-mode read, patterns tried in list
+order, first match wins.
+"""
+
+import io
+import random
+import re
+
+import pytest
+
+from app.deprecation_detector import GENERAL_DEPRECATIONS, LANG_MAP, LANG_NAMES, scan_content
+
+
+def reference_scan(content: bytes, ext: str) -> list[tuple[int, str, str]]:
+    patterns = LANG_MAP.get(ext, []) + GENERAL_DEPRECATIONS
+    text = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8", errors="ignore")
+    found = []
+    for line_num, line in enumerate(text.readlines(), 1):
+        for pattern, message in patterns:
+            if re.search(pattern, line):
+                found.append((line_num, pattern[:50], message))
+                break
+    return found
+
+
+def scan(content: bytes, ext: str) -> list[tuple[int, str, str]]:
+    return [(w.line, w.pattern, w.message) for w in scan_content(content, ext, "f")]
+
+
+# Fragments that hit (or nearly hit) the patterns, plus filler and line breaks
+TOKENS = [
+    "os.popen(", "os.popenx", "optparse", "imp.reload", "imp .x", "cgi.escape", "pkg_resources",
+    "asyncio.coroutine", "@asyncio.coroutine", "collections.Mapping", "typing.Dict", "logging.warn",
+    "distutils", "__defineGetter__", "escape(", "unescape(", "document.write", ".substr(",
+    "new Buffer(", "new  Buffer(", "fs.exists(", "require( 'crypto'", "componentWillMount",
+    "ReactDOM.render", "propTypes =", "propTypes", "=", "new Date( 2", "new Date(", "2020",
+    "x.stop(); Thread", ".resume();", "Thread", "new Integer(", "new Boolean(",
+    "ioutil.ReadAll", "strings.Title", "syscall.Exec", "@Deprecated", "@deprecated", "#", "pragma",
+    "# pragma once deprecated", "deprecated", "[[deprecated]]", "DeprecationWarning", "DEPRECATED",
+    "x", "foo_bar", "9", "(", ")", ".", ";", "'", "\"",
+    # Non-ASCII letters, digits and spaces (and a stray invalid byte below)
+    "é", "ñame", "٣", "\u00a0", "\u2003", "…",
+    " ", " ", " ", "\t", "\n", "\n", "\r\n", "\r",
+]
+
+EXTENSIONS = sorted(set(LANG_NAMES) | {".c", ".md", ""})
+
+
+@pytest.mark.parametrize("ext", EXTENSIONS)
+def test_matches_per_line_scanner(ext):
+    rng = random.Random(ext)
+    for _ in range(1500):
+        content = "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, 40))).encode()
+        if rng.random() < 0.1:
+            content += b"\xff"
+        assert scan(content, ext) == reference_scan(content, ext), content
+
+
+@pytest.mark.parametrize("content, ext", [
+    # First pattern in list order wins, not the leftmost match
+    (b'x = "DEPRECATED"; os.popen("ls")\n', ".py"),
+    # \s must not carry a match over a line break
+    (b"new Date(\n 2020);\n", ".java"),
+    (b"propTypes\n= {};\n", ".js"),
+    (b"#\npragma once deprecated\n", ".c"),
+    # Non-ASCII letters are word characters: no boundary inside these words
+    ("éimp.bar\n".encode(), ".py"),
+    ("é.substr(1)\n".encode(), ".js"),
+    ("imp.é\n".encode(), ".py"),
+    ("new\u00a0Buffer(8)\n".encode(), ".js"),
+])
+def test_known_differences_stay_fixed(content, ext):
+    assert scan(content, ext) == reference_scan(content, ext)
@@ -0,0 +1,54 @@
+"""
+Differential test: the integrity content scan against the original checks.
+
+The reference below is how validate_integrity used to scan a file: a
+text-mode read (lenient UTF-8, universal newlines), then every SECRET_PATTERNS
+and DEBUG_PATTERNS entry searched in list order, first match wins.
+"""
+
+import io
+import random
+
+import pytest
+
+from app.integrity import DEBUG_PATTERNS, SECRET_PATTERNS, _scan_content
+
+
+def reference_scan(content: bytes) -> tuple[bool, str | None]:
+    text = io.TextIOWrapper(io.BytesIO(content), encoding="utf-8", errors="ignore").read()
+    secret = any(pattern.search(text) for pattern in SECRET_PATTERNS)
+    debug = next((f"Debug code detected: {p.pattern[:40]}" for p in DEBUG_PATTERNS if p.search(text)), None)
+    return secret, debug
+
+
+# Fragments that hit (or nearly hit) the patterns, plus filler and line breaks
+TOKENS = [
+    "api_key", "API-SECRET", "apikey", "password", "PASSWD", "pwd", "Pwd", "aws_access_key_id",
+    "AWS_SECRET_ACCESS_KEY", "bearer ", "Bearer", "abcdefghij0123456789xyz", "-----BEGIN",
+    "-----begin", " RSA", "PRIVATE KEY-----", "console.log", "xconsole.log", "ñconsole.log", "print(",
+    "debug", "DEBUG", "TODO", "HACK", "todo", "debugger", "debuggerx", ":", "=", " = ", "'", '"',
+    " ", "  ", "ab", "ñé", "ß", "İ", "日本", "x", "\n", "\r\n", "\r", "\t", "(1)", "_",
+]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        content = "".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 25))).encode()
+        if rng.random() < 0.1:
+            content += b"\xff\xfe"
+        assert _scan_content(content) == reference_scan(content), content
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("pwd: ñé".encode(), (False, None)),
+    ("pwd: ñéab".encode(), (True, None)),
+    ("ñconsole.log(1)".encode(), (False, None)),
+    (b"x console.log(1)", (False, r"Debug code detected: \bconsole\.log\b")),
+    (b"password = 'x\r\nyz'", (False, None)),
+    (b"Bearer abcdefghij0123456789xyz", (True, None)),
+])
+def test_known_cases(content, expected):
+    assert _scan_content(content) == expected
+    assert reference_scan(content) == expected
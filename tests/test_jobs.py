@@ -0,0 +1,96 @@
+"""
+Background analyses: POST /api/analyze?background=1 and GET /api/jobs/{id}.
+
+The analysis itself is stubbed; these cover the job's life cycle and leases.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import main
+from app.database import JOB_LEASE_SECONDS, AnalysisJob, SessionLocal, init_db
+
+
+PAYLOAD = {
+    "repo_name": "acme/app", "repo_url": "https://example.com/acme/app.git", "branch": "main",
+    "head_sha": "e8d8f52", "pusher": "dev", "commits": [],
+}
+
+
+@pytest.fixture(scope="module")
+def client():
+    init_db()
+    with TestClient(main.app) as client:
+        yield client
+
+
+def queue_and_wait(client) -> dict:
+    r = client.post("/api/analyze?background=1", json=PAYLOAD)
+    assert r.status_code == 200
+    assert r.json()["status"] == "queued"
+    job_url = r.json()["job_url"]
+    for _ in range(200):
+        job = client.get(job_url).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job still {job['status']}")
+
+
+def test_job_done(client, monkeypatch):
+    monkeypatch.setattr(main, "_run_analysis", lambda payload, db, force: {"analysis_id": 7})
+    job = queue_and_wait(client)
+    assert job["status"] == "done"
+    assert job["analysis_id"] == 7
+    assert job["result_url"] == "/api/results/7"
+    assert job["finished_at"] is not None
+    assert job["job_id"] not in main._held_jobs
+
+
+@pytest.mark.parametrize("error, detail", [
+    (HTTPException(status_code=400, detail="Clone failed"), "Clone failed"),
+    (RuntimeError("boom"), "RuntimeError: boom"),
+])
+def test_job_failed(client, monkeypatch, error, detail):
+    def fail(payload, db, force):
+        raise error
+    monkeypatch.setattr(main, "_run_analysis", fail)
+    job = queue_and_wait(client)
+    assert job["status"] == "failed"
+    assert job["error"] == detail
+    assert job["analysis_id"] is None
+
+
+def test_unknown_job(client):
+    assert client.get("/api/jobs/nope").status_code == 404
+
+
+def test_expired_lease_fails_job(client):
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        db.add_all([
+            AnalysisJob(id="orphaned", repo_name="acme/app", status="running",
+                        heartbeat_at=now - timedelta(seconds=JOB_LEASE_SECONDS + 1)),
+            AnalysisJob(id="held", repo_name="acme/app", status="running", heartbeat_at=now),
+        ])
+        db.commit()
+    orphaned = client.get("/api/jobs/orphaned").json()
+    assert orphaned["status"] == "failed"
+    assert orphaned["error"].startswith("Interrupted")
+    assert client.get("/api/jobs/held").json()["status"] == "running"
+
+
+def test_unrecorded_outcome_is_logged(monkeypatch, caplog):
+    def no_database():
+        raise RuntimeError("database is locked")
+    monkeypatch.setattr(main, "SessionLocal", no_database)
+    main._hold_job("unrecorded")
+    with caplog.at_level(logging.ERROR, logger="app.main"):
+        main._run_job("unrecorded", main.PushPayload(**PAYLOAD))
+    assert "unrecorded" in caplog.text
+    assert "unrecorded" not in main._held_jobs
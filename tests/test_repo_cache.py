@@ -0,0 +1,68 @@
+"""
+Checkouts of pushed commits: refs and URLs from the payload never reach git
+as options, in either checkout mode.
+"""
+
+import subprocess
+
+import pydantic
+import pytest
+
+from app import repo_cache
+from app.main import PushPayload
+
+
+INJECTED = "--upload-pack=touch {marker}; git-upload-pack"
+
+
+@pytest.fixture
+def origin(tmp_path):
+    repo = tmp_path / "origin"
+    subprocess.run(["git", "init", "--quiet", "--initial-branch=main", str(repo)], check=True)
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", "commit", "--quiet",
+         "--allow-empty", "-m", "first"],
+        check=True,
+    )
+    return f"file://{repo}"
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_checkout_branch(tmp_path, origin, monkeypatch, cache):
+    monkeypatch.setattr(repo_cache, "REPO_CACHE_DIR", str(tmp_path / "cache") if cache else "")
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    mirror = repo_cache.checkout(origin, "main", "main", str(work_dir))
+    assert (mirror is not None) == cache
+    repo_cache.release(mirror, str(work_dir))
+
+
+@pytest.mark.parametrize("cache", [False, True])
+@pytest.mark.parametrize("field", ["branch", "rev"])
+def test_checkout_rejects_options(tmp_path, origin, monkeypatch, cache, field):
+    monkeypatch.setattr(repo_cache, "REPO_CACHE_DIR", str(tmp_path / "cache") if cache else "")
+    marker = tmp_path / "PWNED"
+    injected = INJECTED.format(marker=marker)
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    branch, rev = (injected, injected) if field == "branch" else ("main", injected)
+    with pytest.raises(subprocess.CalledProcessError):
+        repo_cache.checkout(origin, branch, rev, str(work_dir))
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize("field, value", [
+    ("repo_url", "--upload-pack=touch x"),
+    ("branch", "-b"),
+    ("branch", ""),
+    ("head_sha", "--output=x"),
+    ("head_sha", "main"),
+])
+def test_payload_rejects_git_options(field, value):
+    payload = {
+        "repo_name": "acme/app", "repo_url": "https://example.com/acme/app.git", "branch": "main",
+        "head_sha": "e8d8f52", "pusher": "dev",
+    }
+    PushPayload(**payload)
+    with pytest.raises(pydantic.ValidationError):
+        PushPayload(**{**payload, field: value})